@@ -1,8 +1,10 @@
 #include <algorithm>
 #include <cctype>
 #include <cmath>
+#include <cstdint>
 #include <fstream>
 #include <iostream>
+#include <list>
 #include <sstream>
 #include <string>
 #include <unordered_map>
@@ -17,9 +19,16 @@ static std::string trim(std::string s) {
 }
 
 static std::string norm_space(const std::string& in) {
-    std::string s = in;
-    for (char& c : s) {
-        if (c == '\xa0') c = ' ';
+    // UTF-8 NBSP (C2 A0) -> ' '; pavienio 0xA0 neliečiam, nes tai ir kitų raidžių baitas (Š = C5 A0)
+    std::string s;
+    s.reserve(in.size());
+    for (size_t i = 0; i < in.size(); ++i) {
+        if (in[i] == '\xc2' && i + 1 < in.size() && in[i + 1] == '\xa0') {
+            s.push_back(' ');
+            ++i;
+        } else {
+            s.push_back(in[i]);
+        }
     }
     std::string out;
     out.reserve(s.size());
@@ -36,6 +45,37 @@ static std::string norm_space(const std::string& in) {
     return trim(out);
 }
 
+// Lietuviškų raidžių diakritikos nuėmimas + ASCII lowercase (kaip aruodas_canon.fold)
+static std::string fold_lt(const std::string& in) {
+    std::string s = norm_space(in);
+    std::string out;
+    out.reserve(s.size());
+    for (size_t i = 0; i < s.size(); ++i) {
+        unsigned char c = (unsigned char)s[i];
+        if ((c == 0xC4 || c == 0xC5) && i + 1 < s.size()) {
+            unsigned char d = (unsigned char)s[i + 1];
+            char r = 0;
+            if (c == 0xC4) {
+                if (d == 0x84 || d == 0x85) r = 'a';
+                else if (d == 0x8C || d == 0x8D) r = 'c';
+                else if (d == 0x96 || d == 0x97 || d == 0x98 || d == 0x99) r = 'e';
+                else if (d == 0xAE || d == 0xAF) r = 'i';
+            } else {
+                if (d == 0xA0 || d == 0xA1) r = 's';
+                else if (d == 0xAA || d == 0xAB || d == 0xB2 || d == 0xB3) r = 'u';
+                else if (d == 0xBD || d == 0xBE) r = 'z';
+            }
+            if (r) {
+                out.push_back(r);
+                ++i;
+                continue;
+            }
+        }
+        out.push_back(c < 0x80 ? (char)std::tolower(c) : (char)c);
+    }
+    return out;
+}
+
 static std::vector<std::string> parse_csv_line(const std::string& line) {
     std::vector<std::string> fields;
     std::string cur;
@@ -101,6 +141,251 @@ static double median_inplace(std::vector<double>& v) {
     return (v[n / 2 - 1] + v[n / 2]) / 2.0;
 }
 
+// Raw "location | street" -> kompaktiškas int raktas. Alias lentelė bendra su aruodas_canon.py.
+struct KeyCanon {
+    std::unordered_map<std::string, std::string> aliases;
+    bool street_only = false;
+    size_t cache_cap = 65536;
+
+    std::list<std::pair<std::string, int>> lru;
+    std::unordered_map<std::string, std::list<std::pair<std::string, int>>::iterator> cache;
+    std::unordered_map<std::string, int> ids;
+    std::vector<std::string> names;
+    std::vector<std::string> first_raw;
+
+    bool load_aliases(const std::string& path) {
+        std::ifstream f(path, std::ios::binary);
+        if (!f) return false;
+        std::string line;
+        if (!std::getline(f, line)) return true;
+        auto header = parse_csv_line(line);
+        int i_a = -1, i_c = -1;
+        for (int i = 0; i < (int)header.size(); ++i) {
+            std::string h = trim(header[i]);
+            if (h == "alias") i_a = i;
+            else if (h == "canonical") i_c = i;
+        }
+        if (i_a < 0 || i_c < 0) return false;
+        while (std::getline(f, line)) {
+            auto flds = parse_csv_line(line);
+            if ((int)flds.size() <= std::max(i_a, i_c)) continue;
+            std::string a = fold_lt(flds[i_a]);
+            std::string c = fold_lt(flds[i_c]);
+            if (!a.empty() && !c.empty()) aliases[a] = c;
+        }
+        return true;
+    }
+
+    std::string alias(const std::string& s) const {
+        auto it = aliases.find(s);
+        return it == aliases.end() ? s : it->second;
+    }
+
+    std::string canon_part(const std::string& raw) const {
+        std::string s = alias(fold_lt(raw));
+        if (s.empty()) return s;
+        std::string out;
+        size_t start = 0;
+        while (true) {
+            size_t sp = s.find(' ', start);
+            std::string tok = s.substr(start, sp == std::string::npos ? std::string::npos : sp - start);
+            if (!out.empty()) out.push_back(' ');
+            out += alias(tok);
+            if (sp == std::string::npos) break;
+            start = sp + 1;
+        }
+        return out;
+    }
+
+    std::string raw_key(const std::string& loc, const std::string& st) const {
+        return street_only ? st : (loc + " | " + st);
+    }
+
+    // loc ir st jau po norm_space()
+    int key_id(const std::string& loc, const std::string& st) {
+        std::string raw = raw_key(loc, st);
+        auto c = cache.find(raw);
+        if (c != cache.end()) {
+            lru.splice(lru.begin(), lru, c->second);
+            return c->second->second;
+        }
+
+        std::string cst = canon_part(st);
+        std::string canon = street_only ? cst : (canon_part(loc) + " | " + cst);
+        int kid;
+        auto it = ids.find(canon);
+        if (it == ids.end()) {
+            kid = (int)names.size();
+            ids.emplace(canon, kid);
+            names.push_back(canon);
+            first_raw.push_back(raw);
+        } else {
+            kid = it->second;
+        }
+
+        lru.emplace_front(raw, kid);
+        cache[raw] = lru.begin();
+        if (cache.size() > cache_cap) {
+            cache.erase(lru.back().first);
+            lru.pop_back();
+        }
+        return kid;
+    }
+
+    bool is_merged(int kid, const std::string& loc, const std::string& st) const {
+        return raw_key(loc, st) != first_raw[(size_t)kid];
+    }
+};
+
+// Beveik vienodi skelbimai (tas pats butas per kelias agentūras): tas pats raktas ir kambariai,
+// plotas per area_tol m², kaina per price_tol. Signatūra -> bucket'as, tikrinami tik kaimyniniai
+// bucket'ai, todėl klasterizavimas ~tiesinis, be porinių palyginimų.
+struct DupIndex {
+    struct Sig {
+        int key;
+        int rooms;
+        double area_m2;
+        int price_eur;
+    };
+
+    double area_tol = 1.0;
+    double price_tol = 0.03;
+    std::vector<Sig> reps;
+    std::unordered_map<uint64_t, std::vector<int>> buckets;
+
+    static uint64_t mix(uint64_t h, long long v) {
+        h ^= (uint64_t)v + 0x9e3779b97f4a7c15ULL + (h << 6) + (h >> 2);
+        return h;
+    }
+
+    long long area_bucket(double area) const { return (long long)std::floor(area / area_tol); }
+    long long price_bucket(int price) const { return (long long)std::floor(std::log((double)price) / std::log1p(price_tol)); }
+
+    uint64_t bucket(int key, int rooms, long long ab, long long pb) const {
+        return mix(mix(mix(mix(0, key), rooms), ab), pb);
+    }
+
+    bool same(const Sig& a, const Sig& b) const {
+        if (a.key != b.key || a.rooms != b.rooms) return false;
+        if (std::fabs(a.area_m2 - b.area_m2) > area_tol) return false;
+        double lo = std::min(a.price_eur, b.price_eur), hi = std::max(a.price_eur, b.price_eur);
+        return hi <= lo * (1.0 + price_tol);
+    }
+
+    // Grąžina klasterio ID; naujas klasteris, jei reps.size() padidėjo
+    int assign(int key, int rooms, double area_m2, int price_eur) {
+        Sig sig{key, rooms, area_m2, price_eur};
+        if (key < 0 || rooms < 0 || area_m2 <= 0.0 || price_eur <= 0) {
+            reps.push_back(sig);
+            return (int)reps.size() - 1;
+        }
+
+        long long ab = area_bucket(area_m2);
+        long long pb = price_bucket(price_eur);
+        for (long long da = -1; da <= 1; ++da) {
+            for (long long dp = -1; dp <= 1; ++dp) {
+                auto b = buckets.find(bucket(key, rooms, ab + da, pb + dp));
+                if (b == buckets.end()) continue;
+                for (int cid : b->second) {
+                    if (same(reps[(size_t)cid], sig)) return cid;
+                }
+            }
+        }
+
+        int cid = (int)reps.size();
+        reps.push_back(sig);
+        buckets[bucket(key, rooms, ab, pb)].push_back(cid);
+        return cid;
+    }
+};
+
+struct MarketRow {
+    int key = -1;
+    int url_id = -1;
+    int rooms = -1;
+    double area_m2 = -1.0;
+    int price_eur = 0;
+    int irengtas = 0;
+    double eur_per_m2 = 0.0;
+};
+
+// --score knn: k panašiausių skelbimų tame pačiame rakte. Kiekvienam raktui ir kambarių
+// skaičiui taškai surūšiuoti pagal plotą; paieška = binary search + plėtimas į abi puses.
+struct KnnIndex {
+    struct Point {
+        double area_m2;
+        int irengtas;
+        double eur_per_m2;
+        int group;  // URL / dublikatų klasteris, kad kandidatas nebūtų savo paties kaimynas
+    };
+
+    double room_w = 0.25;
+    double irengtas_w = 0.10;
+    std::vector<std::unordered_map<int, std::vector<Point>>> by_key;
+
+    void add(int key, int rooms, double area_m2, int irengtas, double eur_per_m2, int group) {
+        if (key < 0 || area_m2 <= 0.0) return;
+        if ((size_t)key >= by_key.size()) by_key.resize((size_t)key + 1);
+        by_key[(size_t)key][rooms].push_back(Point{area_m2, irengtas ? 1 : 0, eur_per_m2, group});
+    }
+
+    void build() {
+        for (auto& rooms_map : by_key)
+            for (auto& kv : rooms_map)
+                std::sort(kv.second.begin(), kv.second.end(),
+                          [](const Point& a, const Point& b){ return a.area_m2 < b.area_m2; });
+    }
+
+    // Atstumas: |ln(plotų santykis)| + room_w * |kambarių skirtumas| + irengtas_w * (įrengimas skiriasi)
+    // exclude_group >= 0: praleidžiami taškai iš to paties URL / klasterio kaip kandidatas
+    double expected(int key, int rooms, double area_m2, int irengtas, int k, int exclude_group, int& n_used) const {
+        n_used = 0;
+        if (key < 0 || (size_t)key >= by_key.size() || area_m2 <= 0.0 || k <= 0) return 0.0;
+
+        std::vector<std::pair<double, double>> heap;  // (atstumas, €/m²), max-heap pagal atstumą
+        heap.reserve((size_t)k + 1);
+        auto worst = [&]() { return (int)heap.size() < k ? 1e300 : heap.front().first; };
+        auto offer = [&](double d, double eur) {
+            if (d >= worst()) return;
+            heap.emplace_back(d, eur);
+            std::push_heap(heap.begin(), heap.end());
+            if ((int)heap.size() > k) {
+                std::pop_heap(heap.begin(), heap.end());
+                heap.pop_back();
+            }
+        };
+
+        double la = std::log(area_m2);
+        for (const auto& kv : by_key[(size_t)key]) {
+            double room_pen = (rooms >= 0 && kv.first != rooms)
+                ? room_w * (kv.first >= 0 ? std::abs(kv.first - rooms) : 1) : 0.0;
+            if (room_pen >= worst()) continue;
+
+            const auto& pts = kv.second;
+            auto mid = std::lower_bound(pts.begin(), pts.end(), area_m2,
+                                        [](const Point& p, double a){ return p.area_m2 < a; });
+            long long lo = (long long)(mid - pts.begin()) - 1;
+            size_t hi = (size_t)(mid - pts.begin());
+            while (lo >= 0 || hi < pts.size()) {
+                double dlo = lo >= 0 ? la - std::log(pts[(size_t)lo].area_m2) : 1e300;
+                double dhi = hi < pts.size() ? std::log(pts[hi].area_m2) - la : 1e300;
+                const Point& p = dlo <= dhi ? pts[(size_t)lo] : pts[hi];
+                double base = room_pen + std::min(dlo, dhi);
+                if (base >= worst()) break;
+                if (exclude_group < 0 || p.group != exclude_group)
+                    offer(base + (p.irengtas != (irengtas ? 1 : 0) ? irengtas_w : 0.0), p.eur_per_m2);
+                if (dlo <= dhi) --lo; else ++hi;
+            }
+        }
+
+        std::vector<double> vals;
+        vals.reserve(heap.size());
+        for (const auto& h : heap) vals.push_back(h.second);
+        n_used = (int)vals.size();
+        return median_inplace(vals);
+    }
+};
+
 struct Listing {
     std::string scraped_at;
     std::string url;
@@ -111,6 +396,8 @@ struct Listing {
     int irengtas = 0;
     std::string location;
     std::string street;
+    int prev_price_eur = 0;
+    double drop_pct = 0.0;
 };
 
 struct Scored {
@@ -118,39 +405,58 @@ struct Scored {
     double street_median = 0.0;
     int street_n = 0;
     Listing it;
-    std::string key;
+    int key = -1;
 };
 
-static void write_top(const std::string& out_path, const std::vector<Scored>& top,
-                      const std::string& market_csv, int min_street_n, bool street_only, int top_n) {
+static void write_item(std::ofstream& f, size_t rank, const Scored& s, bool knn) {
+    const auto& it = s.it;
+
+    std::string rooms = (it.rooms >= 0) ? (std::to_string(it.rooms) + "k") : "k: n/a";
+    std::string area = (it.area_m2 > 0) ? (std::to_string((int)std::lround(it.area_m2*10.0)/10.0) + " m²") : "m²: n/a";
+    std::string ir = it.irengtas ? "įrengtas" : "neįrengtas";
+    std::string price = it.price_eur > 0 ? (std::to_string(it.price_eur) + " €") : "kaina: n/a";
+
+    f << "#" << rank;
+    if (s.key >= 0) {
+        f << " deal=" << s.deal
+          << (knn ? "  knn_mediana=" : "  gatvės_mediana=")
+          << (int)std::lround(s.street_median) << " €/m² (n=" << s.street_n << ")";
+    } else {
+        f << " deal=n/a";
+    }
+    f << "  skelbimas=" << (int)std::lround(it.eur_per_m2) << " €/m²\n";
+    f << it.location << ", " << it.street << " | " << rooms << " | " << area << " | " << ir << " | " << price << "\n";
+    if (it.drop_pct > 0.0) {
+        f << "KAINA NUKRITO " << std::lround(it.drop_pct * 10.0) / 10.0 << "%"
+          << " (buvo " << it.prev_price_eur << " €)\n";
+    }
+    f << it.url << "\n";
+    f << "----------------------------------------------------------------------\n";
+}
+
+static void write_top(const std::string& out_path, const std::vector<Scored>& top, const std::vector<Scored>& drops,
+                      const std::string& market_csv, int min_street_n, bool street_only, int top_n,
+                      const std::string& aliases_path, bool knn, int knn_k) {
     std::ofstream f(out_path, std::ios::binary);
     if (!f) {
         std::cerr << "NEPAVYKO atidaryti out: " << out_path << "\n";
         return;
     }
 
-    f << "TOP " << top_n << " pagal (gatvės medianinis €/m² iš kainos.csv) / (skelbimo €/m²)\n";
+    if (knn) f << "TOP " << top_n << " pagal (" << knn_k << " panašiausių skelbimų medianinis €/m² iš kainos.csv) / (skelbimo €/m²)\n";
+    else f << "TOP " << top_n << " pagal (gatvės medianinis €/m² iš kainos.csv) / (skelbimo €/m²)\n";
     f << "CSV: " << market_csv
       << " | min_gatves_n=" << min_street_n
-      << " | key=" << (street_only ? "street" : "location+street") << "\n";
+      << " | key=" << (street_only ? "street" : "location+street")
+      << " | aliases=" << (aliases_path.empty() ? "-" : aliases_path) << "\n";
     f << "======================================================================\n\n";
 
-    for (size_t i = 0; i < top.size(); ++i) {
-        const auto& s = top[i];
-        const auto& it = s.it;
-
-        std::string rooms = (it.rooms >= 0) ? (std::to_string(it.rooms) + "k") : "k: n/a";
-        std::string area = (it.area_m2 > 0) ? (std::to_string((int)std::lround(it.area_m2*10.0)/10.0) + " m²") : "m²: n/a";
-        std::string ir = it.irengtas ? "įrengtas" : "neįrengtas";
-        std::string price = it.price_eur > 0 ? (std::to_string(it.price_eur) + " €") : "kaina: n/a";
+    for (size_t i = 0; i < top.size(); ++i) write_item(f, i + 1, top[i], knn);
 
-        f << "#" << (i + 1)
-          << " deal=" << s.deal
-          << "  gatvės_mediana=" << (int)std::lround(s.street_median) << " €/m² (n=" << s.street_n << ")"
-          << "  skelbimas=" << (int)std::lround(it.eur_per_m2) << " €/m²\n";
-        f << it.location << ", " << it.street << " | " << rooms << " | " << area << " | " << ir << " | " << price << "\n";
-        f << it.url << "\n";
-        f << "----------------------------------------------------------------------\n";
+    if (!drops.empty()) {
+        f << "\nDIDŽIAUSI KAINŲ KRITIMAI (TOP " << drops.size() << ")\n";
+        f << "======================================================================\n\n";
+        for (size_t i = 0; i < drops.size(); ++i) write_item(f, i + 1, drops[i], knn);
     }
 }
 
@@ -160,6 +466,14 @@ int main(int argc, char** argv) {
     int min_street_n = 5;
     bool street_only = false;
     int top_n = 3;
+    std::string aliases_path;
+    int drops_top = 0;
+    bool dedup = true;
+    double dup_area_tol = 1.0;
+    double dup_price_tol = 0.03;
+    bool knn = false;
+    int knn_k = 10;
+    bool print_keys = false;
 
     for (int i = 1; i < argc; ++i) {
         std::string a = argv[i];
@@ -168,12 +482,49 @@ int main(int argc, char** argv) {
         else if (a == "--min-street-n" && i + 1 < argc) min_street_n = std::max(1, std::atoi(argv[++i]));
         else if (a == "--street-only") street_only = true;
         else if (a == "--top" && i + 1 < argc) top_n = std::max(1, std::atoi(argv[++i]));
+        else if (a == "--aliases" && i + 1 < argc) aliases_path = argv[++i];
+        else if (a == "--drops-top" && i + 1 < argc) drops_top = std::max(0, std::atoi(argv[++i]));
+        else if (a == "--no-dedup") dedup = false;
+        else if (a == "--score" && i + 1 < argc) {
+            std::string m = argv[++i];
+            if (m == "knn") knn = true;
+            else if (m == "median") knn = false;
+            else {
+                std::cerr << "Nežinomas --score: " << m << " (median|knn)\n";
+                return 2;
+            }
+        }
+        else if (a == "--k" && i + 1 < argc) knn_k = std::max(1, std::atoi(argv[++i]));
+        else if (a == "--print-keys") print_keys = true;
+        else if (a == "--dup-area-tol" && i + 1 < argc) dup_area_tol = std::max(0.1, std::atof(argv[++i]));
+        else if (a == "--dup-price-tol" && i + 1 < argc) dup_price_tol = std::max(0.001, std::atof(argv[++i]));
         else {
             std::cerr << "Nežinomas arg: " << a << "\n";
             return 2;
         }
     }
 
+    KeyCanon canon;
+    canon.street_only = street_only;
+    if (!aliases_path.empty() && !canon.load_aliases(aliases_path)) {
+        std::cerr << "NEPAVYKO nuskaityti aliases: " << aliases_path << " (tęsiama be jų)\n";
+        aliases_path.clear();
+    }
+
+    // STDIN "location,street" -> "key_id\tkanoninis raktas" (palyginimui su aruodas_canon.py)
+    if (print_keys) {
+        std::string kl;
+        std::getline(std::cin, kl);
+        while (std::getline(std::cin, kl)) {
+            if (trim(kl).empty()) continue;
+            auto flds = parse_csv_line(kl);
+            if (flds.size() < 2) continue;
+            int kid = canon.key_id(norm_space(flds[0]), norm_space(flds[1]));
+            std::cout << kid << "\t" << canon.names[(size_t)kid] << "\n";
+        }
+        return 0;
+    }
+
     std::ifstream mf(market_csv, std::ios::binary);
     if (!mf) {
         std::cerr << "NERASTAS market CSV: " << market_csv << "\n";
@@ -203,12 +554,20 @@ int main(int argc, char** argv) {
         std::cerr << "Market CSV trūksta stulpelių (reikia eur_per_m2, location, street)\n";
         return 5;
     }
+    int i_url = need("url");
+    int i_price = need("price_eur");
+    int i_rooms = need("rooms");
+    int i_area = need("area_m2");
+    int i_ir = need("irengtas");
 
-    std::unordered_map<std::string, std::vector<double>> by_key_vals;
-    std::unordered_map<std::string, int> by_key_count;
+    std::vector<MarketRow> rows;
+    std::unordered_map<std::string, int> url_ids;
+    std::vector<long long> url_row;
 
     std::string line;
     long long market_rows = 0;
+    long long market_merged = 0;
+    long long url_dups = 0;
     while (std::getline(mf, line)) {
         if (trim(line).empty()) continue;
         auto flds = parse_csv_line(line);
@@ -221,30 +580,92 @@ int main(int argc, char** argv) {
         std::string st  = norm_space(flds[i_st]);
         if (st.empty()) continue;
 
-        std::string key = street_only ? st : (loc + " | " + st);
-        by_key_vals[key].push_back(eur);
-        by_key_count[key] += 1;
+        MarketRow r;
+        r.key = canon.key_id(loc, st);
+        r.eur_per_m2 = eur;
+        if (i_price >= 0 && i_price < (int)flds.size()) to_int(flds[i_price], r.price_eur);
+        if (i_rooms >= 0 && i_rooms < (int)flds.size()) to_int(flds[i_rooms], r.rooms);
+        if (i_area >= 0 && i_area < (int)flds.size()) to_double(flds[i_area], r.area_m2);
+        if (i_ir >= 0 && i_ir < (int)flds.size()) to_int(flds[i_ir], r.irengtas);
+        if (canon.is_merged(r.key, loc, st)) market_merged++;
         market_rows++;
+
+        if (i_url >= 0 && i_url < (int)flds.size() && !trim(flds[i_url]).empty()) {
+            auto u = url_ids.emplace(trim(flds[i_url]), (int)url_ids.size());
+            if (u.second) url_row.push_back(-1);
+            r.url_id = u.first->second;
+        }
+
+        // Tas pats URL per kelis crawl'us -> lieka naujausia eilutė
+        if (dedup && r.url_id >= 0) {
+            long long& ri = url_row[(size_t)r.url_id];
+            if (ri >= 0) {
+                rows[(size_t)ri] = r;
+                url_dups++;
+                continue;
+            }
+            ri = (long long)rows.size();
+        }
+        rows.push_back(r);
     }
 
-    std::unordered_map<std::string, double> key_median;
-    std::unordered_map<std::string, int> key_n;
-    key_median.reserve(by_key_vals.size());
-    key_n.reserve(by_key_vals.size());
+    std::vector<std::vector<double>> by_key_vals(canon.names.size());
+    KnnIndex knn_idx;
+    std::vector<int> url_group(url_ids.size(), -1);
+    long long near_dups = 0;
+    if (dedup) {
+        DupIndex dup;
+        dup.area_tol = dup_area_tol;
+        dup.price_tol = dup_price_tol;
+        std::vector<std::vector<double>> cluster_vals;
+        std::vector<size_t> cluster_first;
+        for (size_t ri = 0; ri < rows.size(); ++ri) {
+            const auto& r = rows[ri];
+            int cid = dup.assign(r.key, r.rooms, r.area_m2, r.price_eur);
+            if ((size_t)cid >= cluster_vals.size()) {
+                cluster_vals.resize((size_t)cid + 1);
+                cluster_first.resize((size_t)cid + 1, ri);
+            }
+            cluster_vals[(size_t)cid].push_back(r.eur_per_m2);
+            if (r.url_id >= 0) url_group[(size_t)r.url_id] = cid;
+        }
+        for (size_t cid = 0; cid < cluster_vals.size(); ++cid) {
+            const auto& r = rows[cluster_first[cid]];
+            double v = median_inplace(cluster_vals[cid]);
+            by_key_vals[(size_t)r.key].push_back(v);
+            if (knn) knn_idx.add(r.key, r.rooms, r.area_m2, r.irengtas, v, (int)cid);
+        }
+        near_dups = (long long)rows.size() - (long long)cluster_vals.size();
+    } else {
+        for (const auto& r : rows) {
+            by_key_vals[(size_t)r.key].push_back(r.eur_per_m2);
+            if (knn) knn_idx.add(r.key, r.rooms, r.area_m2, r.irengtas, r.eur_per_m2, r.url_id);
+            if (r.url_id >= 0) url_group[(size_t)r.url_id] = r.url_id;
+        }
+    }
+    if (knn) knn_idx.build();
 
-    for (auto& kv : by_key_vals) {
-        const std::string& key = kv.first;
-        auto& vals = kv.second;
+    std::vector<double> key_median(by_key_vals.size(), 0.0);
+    std::vector<int> key_n(by_key_vals.size(), 0);
+    size_t streets_with_median = 0;
+
+    for (size_t key = 0; key < by_key_vals.size(); ++key) {
+        auto& vals = by_key_vals[key];
         int n = (int)vals.size();
         if (n < min_street_n) continue;
-        double med = median_inplace(vals);
-        key_median[key] = med;
+        key_median[key] = median_inplace(vals);
         key_n[key] = n;
+        streets_with_median++;
     }
 
     std::cerr << "[C++] market rows=" << market_rows
-              << " | streets_with_median=" << key_median.size()
+              << " | keys=" << canon.names.size()
+              << " | merged_rows=" << market_merged
+              << " | url_dups=" << url_dups
+              << " | near_dups=" << near_dups
+              << " | streets_with_median=" << streets_with_median
               << " | min_street_n=" << min_street_n
+              << " | score=" << (knn ? "knn k=" + std::to_string(knn_k) : std::string("median"))
               << " | top=" << top_n << "\n";
 
     std::string in_header_line;
@@ -271,23 +692,26 @@ int main(int argc, char** argv) {
     int in_ir = in_need("irengtas");
     int in_loc = in_need("location");
     int in_st = in_need("street");
+    int in_prev = in_need("prev_price_eur");
+    int in_drop = in_need("price_drop_pct");
 
     if (in_url < 0 || in_eur < 0 || in_loc < 0 || in_st < 0) {
         std::cerr << "STDIN CSV trūksta stulpelių (reikia url, eur_per_m2, location, street)\n";
         return 7;
     }
 
-    std::vector<Scored> best;
-    best.reserve((size_t)top_n);
+    std::vector<Scored> cands;
 
-    auto push_best = [&](const Scored& s){
-        best.push_back(s);
-        std::sort(best.begin(), best.end(), [](const Scored& a, const Scored& b){ return a.deal > b.deal; });
-        if ((int)best.size() > top_n) best.resize((size_t)top_n);
+    std::vector<Scored> drops;
+    auto push_drop = [&](const Scored& s){
+        drops.push_back(s);
+        std::sort(drops.begin(), drops.end(), [](const Scored& a, const Scored& b){ return a.it.drop_pct > b.it.drop_pct; });
+        if ((int)drops.size() > drops_top) drops.resize((size_t)drops_top);
     };
 
     long long in_rows = 0;
     long long scored_rows = 0;
+    long long in_merged = 0;
 
     while (std::getline(std::cin, line)) {
         if (trim(line).empty()) continue;
@@ -304,38 +728,72 @@ int main(int argc, char** argv) {
 
         it.location = norm_space(flds[in_loc]);
         it.street = norm_space(flds[in_st]);
-        if (it.street.empty()) { in_rows++; continue; }
 
         if (in_price >= 0 && in_price < (int)flds.size()) to_int(flds[in_price], it.price_eur);
         if (in_rooms >= 0 && in_rooms < (int)flds.size()) to_int(flds[in_rooms], it.rooms);
         if (in_area >= 0 && in_area < (int)flds.size()) to_double(flds[in_area], it.area_m2);
         if (in_ir >= 0 && in_ir < (int)flds.size()) to_int(flds[in_ir], it.irengtas);
-
-        std::string key = street_only ? it.street : (it.location + " | " + it.street);
-        auto km = key_median.find(key);
-        if (km == key_median.end()) { in_rows++; continue; }
-
-        double med = km->second;
-        double deal = med / it.eur_per_m2;
+        if (in_prev >= 0 && in_prev < (int)flds.size()) to_int(flds[in_prev], it.prev_price_eur);
+        if (in_drop >= 0 && in_drop < (int)flds.size()) to_double(flds[in_drop], it.drop_pct);
 
         Scored s;
-        s.deal = deal;
-        s.street_median = med;
-        s.street_n = key_n[key];
         s.it = it;
-        s.key = key;
+        in_rows++;
+
+        if (!it.street.empty()) {
+            int key = canon.key_id(it.location, it.street);
+            if ((size_t)key < key_n.size() && key_n[(size_t)key] > 0) {
+                if (canon.is_merged(key, it.location, it.street)) in_merged++;
+                s.street_median = key_median[(size_t)key];
+                s.street_n = key_n[(size_t)key];
+                s.key = key;
+                if (knn) {
+                    // kandidatas dažniausiai jau appendintas į market CSV -> jo paties neskaičiuojam
+                    int self_group = -1;
+                    auto u = url_ids.find(trim(it.url));
+                    if (u != url_ids.end()) self_group = url_group[(size_t)u->second];
+                    int n_used = 0;
+                    double exp = knn_idx.expected(key, it.rooms, it.area_m2, it.irengtas, knn_k, self_group, n_used);
+                    s.street_median = exp;
+                    s.street_n = n_used;
+                    if (n_used == 0) s.key = -1;
+                }
+                if (s.key >= 0) s.deal = s.street_median / it.eur_per_m2;
+            }
+        }
+
+        if (drops_top > 0 && it.drop_pct > 0.0) push_drop(s);
+        if (s.key < 0) continue;
 
-        push_best(s);
+        cands.push_back(s);
         scored_rows++;
-        in_rows++;
     }
 
-    if (best.empty()) {
+    // TOP N: geriausias deal iš kiekvieno dublikatų klasterio
+    std::sort(cands.begin(), cands.end(), [](const Scored& a, const Scored& b){ return a.deal > b.deal; });
+    std::vector<Scored> best;
+    best.reserve((size_t)top_n);
+    DupIndex top_dup;
+    top_dup.area_tol = dup_area_tol;
+    top_dup.price_tol = dup_price_tol;
+    long long top_dups = 0;
+    for (const auto& s : cands) {
+        if ((int)best.size() >= top_n) break;
+        if (dedup) {
+            size_t before = top_dup.reps.size();
+            top_dup.assign(s.key, s.it.rooms, s.it.area_m2, s.it.price_eur);
+            if (top_dup.reps.size() == before) { top_dups++; continue; }
+        }
+        best.push_back(s);
+    }
+
+    if (best.empty() && drops.empty()) {
         std::cerr << "[C++] Nėra TOP (trūksta medianų pagal min_street_n)\n";
         return 8;
     }
 
-    write_top(out_txt, best, market_csv, min_street_n, street_only, top_n);
-    std::cerr << "[C++] in_rows=" << in_rows << " | scored=" << scored_rows << " | wrote=" << out_txt << "\n";
+    write_top(out_txt, best, drops, market_csv, min_street_n, street_only, top_n, aliases_path, knn, knn_k);
+    std::cerr << "[C++] in_rows=" << in_rows << " | scored=" << scored_rows
+              << " | merged=" << in_merged << " | top_dups=" << top_dups << " | drops=" << drops.size() << " | wrote=" << out_txt << "\n";
     return 0;
 }
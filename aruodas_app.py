@@ -26,6 +26,7 @@ def main():
         "--top", str(top_n),
         "--analyzer", _resource_path("aruodas_analyze.exe"),
         "--market-csv", _resource_path("kainos.csv"),
+        "--aliases", _resource_path("street_aliases.csv"),
         "--out-top3", "deals_top3.txt",
         "--append-to-market",
     ]
@@ -5,7 +5,7 @@ a = Analysis(
     ['aruodas_app.py'],
     pathex=[],
     binaries=[('aruodas_analyze.exe', '.')],
-    datas=[('kainos.csv', '.')],
+    datas=[('kainos.csv', '.'), ('street_aliases.csv', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Gatvių / vietovių raktų kanonizavimas. Ta pati logika yra aruodas_analyzer.cpp
+# (KeyCanon), abu naudoja tą pačią street_aliases.csv lentelę.
+
+import argparse
+import csv
+import io
+import os
+import re
+import subprocess
+from collections import OrderedDict
+
+ALIASES_DEFAULT = "street_aliases.csv"
+CACHE_SIZE_DEFAULT = 65536
+
+# Tik lietuviškos raidės, kad sutaptų su C++ fold_lt()
+_LT_FOLD = str.maketrans({
+    "ą": "a", "č": "c", "ę": "e", "ė": "e", "į": "i", "š": "s", "ų": "u", "ū": "u", "ž": "z",
+    "Ą": "a", "Č": "c", "Ę": "e", "Ė": "e", "Į": "i", "Š": "s", "Ų": "u", "Ū": "u", "Ž": "z",
+})
+
+
+def norm_space(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip()
+
+
+def fold(s: str) -> str:
+    s = norm_space(s).translate(_LT_FOLD)
+    return "".join(ch.lower() if ch.isascii() else ch for ch in s)
+
+
+def load_aliases(path: str) -> dict:
+    aliases = {}
+    if not path or not os.path.exists(path):
+        return aliases
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            a = fold(row.get("alias", ""))
+            c = fold(row.get("canonical", ""))
+            if a and c:
+                aliases[a] = c
+    return aliases
+
+
+class KeyCanon:
+    def __init__(self, aliases: dict | None = None, street_only: bool = False, cache_size: int = CACHE_SIZE_DEFAULT):
+        self.aliases = aliases or {}
+        self.street_only = street_only
+        self.cache_size = max(1, int(cache_size))
+
+        self._cache = OrderedDict()
+        self._ids = {}
+        self._names = []
+        self._first_raw = []
+
+        self.rows = 0
+        self.merged_rows = 0
+
+    def canon_part(self, s: str) -> str:
+        s = fold(s)
+        s = self.aliases.get(s, s)
+        return " ".join(self.aliases.get(t, t) for t in s.split(" ")) if s else ""
+
+    def raw_key(self, location: str, street: str) -> str:
+        st = norm_space(street)
+        return st if self.street_only else (norm_space(location) + " | " + st)
+
+    def key_id(self, location: str, street: str) -> int:
+        raw = self.raw_key(location, street)
+        self.rows += 1
+
+        kid = self._cache.get(raw)
+        if kid is not None:
+            self._cache.move_to_end(raw)
+        else:
+            st = self.canon_part(street)
+            canon = st if self.street_only else (self.canon_part(location) + " | " + st)
+            kid = self._ids.get(canon)
+            if kid is None:
+                kid = len(self._names)
+                self._ids[canon] = kid
+                self._names.append(canon)
+                self._first_raw.append(raw)
+            self._cache[raw] = kid
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if raw != self._first_raw[kid]:
+            self.merged_rows += 1
+        return kid
+
+    def name(self, kid: int) -> str:
+        return self._names[kid]
+
+    def __len__(self):
+        return len(self._names)
+
+
+# Kiekviena grupė turi gauti vieną raktą ir Python, ir C++ pusėje
+CHECK_GROUPS = [
+    [("Žvėrynas", "Šilo g."), ("žvėrynas", "šilo g."), ("ŽVĖRYNAS", "ŠILO G."), ("Zverynas", "Šilo\xa0gatvė")],
+    [("Senamiestis", "Gedimino pr."), ("senamiestis", "GEDIMINO PROSPEKTAS"), ("Senamiestis", "Gedimino  pr")],
+    [("Užupis", "Krivių g."), ("UŽUPIS", "KRIVIŲ GATVĖ")],
+]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Python ir C++ raktų kanonizacijos palyginimas")
+    ap.add_argument("--analyzer", default="aruodas_analyze.exe", help="C++ analizatorius")
+    ap.add_argument("--aliases", default=ALIASES_DEFAULT)
+    args = ap.parse_args(argv)
+
+    pairs = [p for g in CHECK_GROUPS for p in g]
+    canon = KeyCanon(load_aliases(args.aliases))
+    py = []
+    for loc, st in pairs:
+        kid = canon.key_id(loc, st)
+        py.append((kid, canon.name(kid)))
+
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(["location", "street"])
+    w.writerows(pairs)
+    try:
+        r = subprocess.run([args.analyzer, "--print-keys", "--aliases", args.aliases],
+                           input=buf.getvalue().encode("utf-8"), stdout=subprocess.PIPE)
+    except OSError as e:
+        print(f"FAIL: nepavyko paleisti analizatoriaus {args.analyzer}: {e}")
+        return 1
+    cpp = []
+    for ln in r.stdout.decode("utf-8", errors="replace").splitlines():
+        kid, name = ln.split("\t", 1)
+        cpp.append((int(kid), name))
+
+    bad = 0
+    i = 0
+    for g in CHECK_GROUPS:
+        ids_py = {py[i + j][0] for j in range(len(g))}
+        ids_cpp = {cpp[i + j][0] for j in range(len(g))} if len(cpp) == len(pairs) else set()
+        for j, (loc, st) in enumerate(g):
+            same = len(cpp) == len(pairs) and py[i + j] == cpp[i + j]
+            if not same:
+                bad += 1
+                print(f"NESUTAMPA: {loc} | {st}: py={py[i + j]} cpp={cpp[i + j] if len(cpp) == len(pairs) else None}")
+        if len(ids_py) != 1 or len(ids_cpp) != 1:
+            bad += 1
+            print(f"GRUPĖ NESULIETA: {g[0][0]} | {g[0][1]}: py={sorted(ids_py)} cpp={sorted(ids_cpp)}")
+        i += len(g)
+
+    if bad or r.returncode != 0:
+        print(f"FAIL: {bad} neatitikimų (analizatorius rc={r.returncode})")
+        return 1
+    print(f"OK: {canon.rows} variantų -> {len(canon)} raktų (sulieta {canon.merged_rows}), Python == C++")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
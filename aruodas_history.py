@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Skelbimų kainų istorija: append-only CSV, į kurį rašoma tik pasikeitus kainai.
+# Įkėlus laikomas indeksas listing_id -> pokyčių sąrašas (O(1) paieška).
+
+import argparse
+import csv
+import os
+import re
+from datetime import datetime, timedelta
+
+HISTORY_DEFAULT = "kainu_istorija.csv"
+FIELDNAMES = ["listing_id", "ts", "price_eur", "eur_per_m2"]
+
+
+def listing_id(url: str) -> str:
+    u = (url or "").strip().split("?", 1)[0].split("#", 1)[0].rstrip("/")
+    m = re.search(r"(\d+-\d+)$", u)
+    if m:
+        return m.group(1)
+    return u.rsplit("/", 1)[-1]
+
+
+def _to_int(v):
+    try:
+        return int(round(float(v)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_ts(ts: str):
+    try:
+        return datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceHistory:
+    def __init__(self, path: str):
+        self.path = path
+        self.index = {}
+        self.pending = []
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    lid = row.get("listing_id", "")
+                    if not lid:
+                        continue
+                    self.index.setdefault(lid, []).append(
+                        (row.get("ts", ""), _to_int(row.get("price_eur")), _to_float(row.get("eur_per_m2")))
+                    )
+
+    def get(self, lid: str) -> list:
+        return self.index.get(lid, [])
+
+    def last(self, lid: str):
+        h = self.index.get(lid)
+        return h[-1] if h else None
+
+    def record(self, url: str, ts: str, price_eur, eur_per_m2) -> bool:
+        lid = listing_id(url)
+        price = _to_int(price_eur)
+        if not lid or price is None or price <= 0:
+            return False
+        prev = self.last(lid)
+        if prev is not None and prev[1] == price:
+            return False
+        entry = (ts, price, _to_float(eur_per_m2))
+        self.index.setdefault(lid, []).append(entry)
+        self.pending.append({
+            "listing_id": lid,
+            "ts": ts,
+            "price_eur": price,
+            "eur_per_m2": "" if entry[2] is None else entry[2],
+        })
+        return True
+
+    # (ankstesnė kaina, kritimas %), jei paskutinis pokytis per `days` d. buvo kainos sumažėjimas
+    def recent_drop(self, url: str, now: str, days: float):
+        h = self.index.get(listing_id(url))
+        if not h or len(h) < 2:
+            return None
+        (_, prev_price, _), (ts, price, _) = h[-2], h[-1]
+        if not prev_price or not price or price >= prev_price:
+            return None
+        t_now, t_chg = _parse_ts(now), _parse_ts(ts)
+        if t_now is None or t_chg is None or t_now - t_chg > timedelta(days=days):
+            return None
+        return prev_price, 100.0 * (prev_price - price) / prev_price
+
+    def save(self):
+        if not self.pending or not self.path:
+            return 0
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            if is_new:
+                w.writeheader()
+            for r in self.pending:
+                w.writerow(r)
+        n = len(self.pending)
+        self.pending = []
+        return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Kainų istorija iš esamo kainos.csv")
+    ap.add_argument("market_csv", help="kainos.csv")
+    ap.add_argument("--history", default=HISTORY_DEFAULT, help="istorijos CSV (appendinama)")
+    args = ap.parse_args(argv)
+
+    hist = PriceHistory(args.history)
+    rows = 0
+    with open(args.market_csv, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            hist.record(r.get("url", ""), r.get("scraped_at", ""), r.get("price_eur"), r.get("eur_per_m2"))
+            rows += 1
+
+    n = hist.save()
+    print(f"OK: {rows} eilučių -> +{n} kainų pokyčių ({len(hist.index)} skelbimų) į {args.history}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
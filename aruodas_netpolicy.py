@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Tinklo politika Playwright crawl'ui: ką blokuoti pagal resource type / domeną,
+# ar įjungti JS, ir kiek užklausų / baitų leista ir užblokuota kiekviename puslapyje.
+
+import csv
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+NET_LOG_DEFAULT = "tinklo_statistika.csv"
+
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "gemius.pl",
+    "adform.net",
+    "criteo.com",
+    "criteo.net",
+    "adnxs.com",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "cookiebot.com",
+    "clarity.ms",
+)
+
+POLICIES = {
+    # Kaip buvo iki šiol
+    "default": {
+        "block_types": ("image", "media", "font"),
+        "block_domains": (),
+        "allow_domains": (),
+        "javascript": True,
+    },
+    "lean": {
+        "block_types": ("image", "media", "font", "stylesheet", "texttrack", "manifest", "other"),
+        "block_domains": TRACKER_DOMAINS,
+        "allow_domains": (),
+        "javascript": True,
+    },
+    # Tik aruodas.lt HTML, be JS (sąrašas serverio renderintas)
+    "strict": {
+        "block_types": ("image", "media", "font", "stylesheet", "script", "xhr", "fetch",
+                        "eventsource", "websocket", "texttrack", "manifest", "other"),
+        "block_domains": TRACKER_DOMAINS,
+        "allow_domains": ("aruodas.lt",),
+        "javascript": False,
+    },
+}
+
+
+def split_list(s: str) -> list[str]:
+    return [x.strip().lower() for x in (s or "").split(",") if x.strip()]
+
+
+def _host_in(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class NetPolicy:
+    def __init__(self, name: str = "default", block_types=(), allow_types=(),
+                 block_domains=(), allow_domains=(), javascript=None):
+        base = POLICIES[name]
+        self.name = name
+        self.block_types = (set(base["block_types"]) | set(block_types)) - set(allow_types)
+        self.block_domains = tuple(base["block_domains"]) + tuple(block_domains)
+        self.allow_domains = tuple(base["allow_domains"]) + tuple(allow_domains)
+        self.javascript = base["javascript"] if javascript is None else bool(javascript)
+
+        custom = [
+            f"+{','.join(block_types)}" if block_types else "",
+            f"-{','.join(allow_types)}" if allow_types else "",
+            f"+d:{','.join(block_domains)}" if block_domains else "",
+            f"allow:{','.join(allow_domains)}" if allow_domains else "",
+            "" if javascript is None else ("js" if self.javascript else "nojs"),
+        ]
+        self.label = " ".join([name] + [c for c in custom if c])
+
+    # top_level: pagrindinio puslapio navigacija; iframe'ų "document" tikrinami kaip visi kiti
+    def allows(self, resource_type: str, url: str, top_level: bool = False) -> bool:
+        if top_level:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        if _host_in(host, self.block_domains):
+            return False
+        if self.allow_domains and not _host_in(host, self.allow_domains):
+            return False
+        return resource_type == "document" or resource_type not in self.block_types
+
+
+class NetStats:
+    def __init__(self, policy: NetPolicy):
+        self.policy = policy
+        self.pages = 0
+        self.page_ms = 0.0
+        self.allowed_req = 0
+        self.allowed_bytes = 0
+        self.blocked_req = 0
+        self.blocked_by_type = Counter()
+        self.bytes_by_type = Counter()
+        self.req_by_type = Counter()
+        self._page = None
+        self._t0 = 0.0
+        self._unsized = []
+
+    def route_handler(self, route):
+        req = route.request
+        rt = req.resource_type
+        try:
+            top_level = req.is_navigation_request() and req.frame.parent_frame is None
+        except Exception:
+            top_level = False
+        if not self.policy.allows(rt, req.url, top_level):
+            self.blocked_req += 1
+            self.blocked_by_type[rt] += 1
+            if self._page is not None:
+                self._page["blocked_req"] += 1
+            return route.abort()
+        return route.continue_()
+
+    # request.sizes() yra papildomas kreipinys į naršyklę, todėl čia tik įsimenam,
+    # o dydžius skaičiuojam _flush_sizes() jau po puslapio laiko matavimo
+    def on_request_finished(self, request):
+        self.allowed_req += 1
+        self.req_by_type[request.resource_type] += 1
+        if self._page is not None:
+            self._page["allowed_req"] += 1
+        self._unsized.append((request, self._page))
+
+    def _flush_sizes(self):
+        pending, self._unsized = self._unsized, []
+        for request, page in pending:
+            try:
+                sz = request.sizes()
+                n = (sz.get("responseBodySize", 0) + sz.get("responseHeadersSize", 0)
+                     + sz.get("requestBodySize", 0) + sz.get("requestHeadersSize", 0))
+            except Exception:
+                n = 0
+            n = max(0, int(n))
+            self.allowed_bytes += n
+            self.bytes_by_type[request.resource_type] += n
+            if page is not None:
+                page["allowed_bytes"] += n
+
+    def attach(self, ctx):
+        ctx.route("**/*", self.route_handler)
+        ctx.on("requestfinished", self.on_request_finished)
+
+    def start_page(self):
+        self._page = {"allowed_req": 0, "allowed_bytes": 0, "blocked_req": 0}
+        self._t0 = time.perf_counter()
+
+    def end_page(self) -> str:
+        ms = (time.perf_counter() - self._t0) * 1000.0
+        p = self._page or {"allowed_req": 0, "allowed_bytes": 0, "blocked_req": 0}
+        self._page = None
+        self._flush_sizes()
+        self.pages += 1
+        self.page_ms += ms
+        return (f"  tinklas: {ms:.0f} ms | leista {p['allowed_req']} req / {p['allowed_bytes'] / 1024:.0f} KB"
+                f" | blokuota {p['blocked_req']} req")
+
+    # Užblokuotų baitų įvertis: tipo vidurkis iš leistų užklausų (jei tokių buvo)
+    def blocked_bytes_estimate(self):
+        est, unknown = 0, 0
+        for rt, n in self.blocked_by_type.items():
+            if self.req_by_type[rt]:
+                est += n * self.bytes_by_type[rt] / self.req_by_type[rt]
+            else:
+                unknown += n
+        return int(est), unknown
+
+    def summary_row(self) -> dict:
+        self._flush_sizes()
+        pages = max(1, self.pages)
+        est, unknown = self.blocked_bytes_estimate()
+        return {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "policy": self.policy.label,
+            "pages": self.pages,
+            "avg_page_ms": round(self.page_ms / pages, 1),
+            "allowed_req_per_page": round(self.allowed_req / pages, 1),
+            "allowed_kb_per_page": round(self.allowed_bytes / 1024 / pages, 1),
+            "blocked_req_per_page": round(self.blocked_req / pages, 1),
+            "blocked_kb_est_per_page": round(est / 1024 / pages, 1),
+            "blocked_unknown_req": unknown,
+        }
+
+    def summary(self, log_path: str = "") -> str:
+        row = self.summary_row()
+        lines = [
+            f"Tinklo politika: {row['policy']} | JS: {'taip' if self.policy.javascript else 'ne'}",
+            f"  puslapių: {row['pages']} | vid. {row['avg_page_ms']} ms/psl.",
+            f"  leista: {row['allowed_req_per_page']} req, {row['allowed_kb_per_page']} KB /psl.",
+            f"  blokuota: {row['blocked_req_per_page']} req /psl. (~{row['blocked_kb_est_per_page']} KB /psl.,"
+            f" be įverčio: {row['blocked_unknown_req']} req)",
+        ]
+        if self.blocked_by_type:
+            lines.append("  blokuota pagal tipą: " + ", ".join(f"{k}={v}" for k, v in self.blocked_by_type.most_common()))
+
+        if log_path:
+            prev = last_runs(log_path)
+            for label, p in prev.items():
+                if label == row["policy"]:
+                    continue
+                try:
+                    d_kb = float(p["allowed_kb_per_page"]) - row["allowed_kb_per_page"]
+                    d_ms = float(p["avg_page_ms"]) - row["avg_page_ms"]
+                except (KeyError, ValueError):
+                    continue
+                lines.append(f"  vs {label}: sutaupyta {d_kb:.1f} KB /psl., {d_ms:.0f} ms /psl.")
+            if self.pages:
+                append_run(log_path, row)
+        return "\n".join(lines)
+
+
+def last_runs(path: str) -> dict:
+    runs = {}
+    if not path or not os.path.exists(path):
+        return runs
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            runs[r.get("policy", "")] = r
+    return runs
+
+
+def append_run(path: str, row: dict):
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(row.keys()))
+        if is_new:
+            w.writeheader()
+        w.writerow(row)
+
+
+def add_args(ap):
+    ap.add_argument("--net-policy", choices=sorted(POLICIES), default="default", help="tinklo politika")
+    ap.add_argument("--block-types", default="", help="papildomai blokuoti resource types (kableliais)")
+    ap.add_argument("--allow-types", default="", help="neblokuoti šių resource types (kableliais)")
+    ap.add_argument("--block-domains", default="", help="papildomai blokuoti domenus (kableliais)")
+    ap.add_argument("--allow-domains", default="", help="leisti tik šiuos domenus (kableliais)")
+    js = ap.add_mutually_exclusive_group()
+    js.add_argument("--no-js", dest="javascript", action="store_false", default=None, help="išjungti JS")
+    js.add_argument("--js", dest="javascript", action="store_true", help="įjungti JS")
+    ap.add_argument("--net-log", default=NET_LOG_DEFAULT, help="tinklo suvestinių CSV (tuščia = nerašyti)")
+
+
+def policy_from_args(args) -> NetPolicy:
+    return NetPolicy(
+        name=args.net_policy,
+        block_types=split_list(args.block_types),
+        allow_types=split_list(args.allow_types),
+        block_domains=split_list(args.block_domains),
+        allow_domains=split_list(args.allow_domains),
+        javascript=args.javascript,
+    )
@@ -13,6 +13,9 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 
+from aruodas_history import HISTORY_DEFAULT, PriceHistory
+from aruodas_netpolicy import NetStats, add_args as add_net_args, policy_from_args
+
 
 OUT_CSV_DEFAULT = "kainos.csv"
 
@@ -171,6 +174,8 @@ def main():
     ap.add_argument("--max-pages", type=int, default=0, help="0 = unlimited")
     ap.add_argument("--delay", default="0.10,0.25", help="Delay between pages: min,max")
     ap.add_argument("--timeout", type=int, default=25000)
+    ap.add_argument("--history", default=HISTORY_DEFAULT, help="Price history CSV (empty = off)")
+    add_net_args(ap)
     args = ap.parse_args()
 
     try:
@@ -184,6 +189,18 @@ def main():
     if not os.path.isabs(out_csv):
         out_csv = os.path.join(script_dir(), out_csv)
 
+    history = None
+    if args.history:
+        history_path = args.history
+        if not os.path.isabs(history_path):
+            history_path = os.path.join(script_dir(), history_path)
+        history = PriceHistory(history_path)
+
+    net = NetStats(policy_from_args(args))
+    net_log = args.net_log
+    if net_log and not os.path.isabs(net_log):
+        net_log = os.path.join(script_dir(), net_log)
+
     scraped_at = datetime.now().isoformat(timespec="seconds")
 
     seen_listing_urls = set()
@@ -200,16 +217,11 @@ def main():
             user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                         "(KHTML, like Gecko) Chrome/123.0 Safari/537.36"),
             viewport={"width": 1280, "height": 800},
+            java_script_enabled=net.policy.javascript,
         )
 
-        # Block non-essential resources
-        def route_handler(route):
-            rt = route.request.resource_type
-            if rt in ("image", "media", "font"):
-                return route.abort()
-            return route.continue_()
-
-        ctx.route("**/*", route_handler)
+        # Block non-essential resources (see aruodas_netpolicy.POLICIES)
+        net.attach(ctx)
         page = ctx.new_page()
 
         try:
@@ -224,12 +236,14 @@ def main():
                     break
 
                 print(f"[{page_no}] OPEN {url}")
+                net.start_page()
                 page.goto(url, wait_until="domcontentloaded", timeout=args.timeout)
 
                 try:
                     page.wait_for_selector("li.result-item-big-thumb", timeout=8000)
                 except Exception:
                     pass
+                print(net.end_page())
 
                 html = page.content()
                 items, next_url = parse_page(html, base_url=url)
@@ -247,6 +261,13 @@ def main():
                 if out_rows:
                     append_to_csv(out_csv, out_rows)
                     total_written += len(out_rows)
+                    if history is not None:
+                        for r in out_rows:
+                            history.record(r["url"], scraped_at, r["price_eur"], r["eur_per_m2"])
+                        try:
+                            history.save()
+                        except Exception as e:
+                            print(f"Istorijos įrašymo klaida: {e}")
 
                 print(f"  rasta: {len(items)} | nauja įrašyta: {len(out_rows)} | viso įrašyta: {total_written}")
 
@@ -269,6 +290,11 @@ def main():
             except Exception:
                 pass
 
+    try:
+        print(net.summary(net_log))
+    except Exception as e:
+        print(f"Tinklo suvestinės klaida: {e}")
+
     print(f"OK: įrašyta į {out_csv} (+{total_written} eilučių)")
 
 
@@ -37,6 +37,10 @@ _force_playwright_browsers_path()
 
 from playwright.sync_api import sync_playwright
 
+from aruodas_canon import ALIASES_DEFAULT
+from aruodas_history import HISTORY_DEFAULT, PriceHistory
+from aruodas_netpolicy import NetStats, add_args as add_net_args, policy_from_args
+
 
 OUT_CSV_DEFAULT = "kainos.csv"
 OUT_TXT_DEFAULT = "deals_top3.txt"
@@ -225,8 +229,9 @@ def parse_page(html: str, base_url: str):
     return items, next_url
 
 
-def run_cpp_analyzer(analyzer_path: str, market_csv: str, out_txt: str, top_n: int, min_street_n: int, street_only: bool, scraped_rows: list[dict]):
-    header = ["scraped_at", "url", "price_eur", "eur_per_m2", "rooms", "area_m2", "irengtas", "location", "street"]
+def run_cpp_analyzer(analyzer_path: str, market_csv: str, out_txt: str, top_n: int, min_street_n: int, street_only: bool, scraped_rows: list[dict], aliases_path: str = "", drops_top: int = 0, dedup: bool = True, score: str = "median", knn_k: int = 10):
+    header = ["scraped_at", "url", "price_eur", "eur_per_m2", "rooms", "area_m2", "irengtas", "location", "street",
+              "prev_price_eur", "price_drop_pct"]
 
     def esc(v: str) -> str:
         v = "" if v is None else str(v)
@@ -248,6 +253,8 @@ def run_cpp_analyzer(analyzer_path: str, market_csv: str, out_txt: str, top_n: i
             "irengtas": "" if r.get("irengtas") is None else str(r.get("irengtas")),
             "location": r.get("location", ""),
             "street": r.get("street", ""),
+            "prev_price_eur": "" if r.get("prev_price_eur") is None else str(r.get("prev_price_eur")),
+            "price_drop_pct": "" if r.get("price_drop_pct") is None else f"{r.get('price_drop_pct'):.1f}",
         }
         lines.append(",".join(esc(row[h]) for h in header) + "\n")
 
@@ -262,6 +269,14 @@ def run_cpp_analyzer(analyzer_path: str, market_csv: str, out_txt: str, top_n: i
     ]
     if street_only:
         cmd.append("--street-only")
+    if aliases_path:
+        cmd += ["--aliases", aliases_path]
+    if drops_top and drops_top > 0:
+        cmd += ["--drops-top", str(int(drops_top))]
+    if not dedup:
+        cmd.append("--no-dedup")
+    if score == "knn":
+        cmd += ["--score", "knn", "--k", str(max(1, int(knn_k)))]
 
     r = subprocess.run(cmd, input=stdin_blob, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     sys.stdout.write(r.stdout.decode("utf-8", errors="replace"))
@@ -281,12 +296,20 @@ def main(argv=None):
     ap.add_argument("--top", type=int, default=3, help="TOP N")
     ap.add_argument("--min-street-n", type=int, default=5)
     ap.add_argument("--street-only", action="store_true")
+    ap.add_argument("--aliases", default=ALIASES_DEFAULT, help="gatvių alias lentelė (tuščia = be jos)")
+    ap.add_argument("--history", default=HISTORY_DEFAULT, help="kainų istorija (tuščia = neišsaugoti)")
+    ap.add_argument("--drop-days", type=float, default=7.0, help="kiek dienų kainos kritimas laikomas nauju")
+    ap.add_argument("--drops-top", type=int, default=0, help="TOP N kainų kritimų (0 = nerodyti)")
+    ap.add_argument("--no-dedup", action="store_true", help="nesulieti to paties buto skelbimų iš kelių agentūrų")
+    ap.add_argument("--score", choices=["median", "knn"], default="median", help="gatvės mediana arba k panašiausių skelbimų")
+    ap.add_argument("--k", type=int, default=10, help="kaimynų skaičius --score knn")
 
     ap.add_argument("--headless", action="store_true")
     ap.add_argument("--max-pages", type=int, default=0, help="0 = be limito")
     ap.add_argument("--max-items", type=int, default=0, help="0 = be limito")
     ap.add_argument("--delay", default="0.10,0.25")
     ap.add_argument("--timeout", type=int, default=25000)
+    add_net_args(ap)
 
     g = ap.add_mutually_exclusive_group()
     g.add_argument("--append-to-market", action="store_true", help="appendinti surinktus į market-csv")
@@ -313,6 +336,17 @@ def main(argv=None):
     if not os.path.isabs(out_top3):
         out_top3 = os.path.join(script_dir(), out_top3)
 
+    aliases_path = (args.aliases or "").strip()
+    if aliases_path and not os.path.isabs(aliases_path):
+        aliases_path = os.path.join(script_dir(), aliases_path)
+    if aliases_path and not os.path.exists(aliases_path):
+        print(f"NERASTA alias lentelė: {aliases_path} (tęsiama be jos)")
+        aliases_path = ""
+
+    history_path = (args.history or "").strip()
+    if history_path and not os.path.isabs(history_path):
+        history_path = os.path.join(script_dir(), history_path)
+
     analyzer_path = ensure_analyzer_path(args.analyzer)
     if not os.path.exists(analyzer_path):
         print(f"NERASTAS analizatorius: {analyzer_path}")
@@ -324,6 +358,11 @@ def main(argv=None):
     elif args.append_to_market:
         append_to_market = True
 
+    net = NetStats(policy_from_args(args))
+    net_log = args.net_log
+    if net_log and not os.path.isabs(net_log):
+        net_log = os.path.join(script_dir(), net_log)
+
     scraped_at = datetime.now().isoformat(timespec="seconds")
 
     seen_listing_urls = set()
@@ -345,15 +384,10 @@ def main(argv=None):
             user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                         "(KHTML, like Gecko) Chrome/123.0 Safari/537.36"),
             viewport={"width": 1280, "height": 800},
+            java_script_enabled=net.policy.javascript,
         )
 
-        def route_handler(route):
-            rt = route.request.resource_type
-            if rt in ("image", "media", "font"):
-                return route.abort()
-            return route.continue_()
-
-        ctx.route("**/*", route_handler)
+        net.attach(ctx)
         page = ctx.new_page()
 
         try:
@@ -368,12 +402,14 @@ def main(argv=None):
                     break
 
                 print(f"[{page_no}] OPEN {url}")
+                net.start_page()
                 page.goto(url, wait_until="domcontentloaded", timeout=args.timeout)
 
                 try:
                     page.wait_for_selector("li.result-item-big-thumb", timeout=8000)
                 except Exception:
                     pass
+                print(net.end_page())
 
                 html = page.content()
                 items, next_url = parse_page(html, base_url=url)
@@ -421,6 +457,11 @@ def main(argv=None):
             except Exception:
                 pass
 
+    try:
+        print(net.summary(net_log))
+    except Exception as e:
+        print(f"Tinklo suvestinės klaida: {e}")
+
     if not collected:
         print("0 skelbimų.")
         return 4
@@ -431,6 +472,28 @@ def main(argv=None):
         except Exception as e:
             print(f"CSV append klaida: {e}")
 
+    drops = 0
+    if history_path:
+        hist = PriceHistory(history_path)
+        for r in collected:
+            hist.record(r["url"], r["scraped_at"], r.get("price_eur"), r.get("eur_per_m2"))
+        try:
+            changes = hist.save()
+        except Exception as e:
+            changes = 0
+            print(f"Istorijos įrašymo klaida: {e}")
+
+        scored_rows = []
+        for r in collected:
+            d = hist.recent_drop(r["url"], scraped_at, args.drop_days)
+            if d:
+                drops += 1
+                r = {**r, "prev_price_eur": d[0], "price_drop_pct": d[1]}
+            scored_rows.append(r)
+        print(f"Kainų istorija: +{changes} pokyčių | kritimų per {args.drop_days:g} d.: {drops}")
+    else:
+        scored_rows = collected
+
     rc = run_cpp_analyzer(
         analyzer_path=analyzer_path,
         market_csv=market_csv,
@@ -438,7 +501,12 @@ def main(argv=None):
         top_n=args.top,
         min_street_n=args.min_street_n,
         street_only=args.street_only,
-        scraped_rows=collected,
+        scraped_rows=scored_rows,
+        aliases_path=aliases_path,
+        drops_top=args.drops_top,
+        dedup=not args.no_dedup,
+        score=args.score,
+        knn_k=args.k,
     )
 
     if rc != 0: